@@ -0,0 +1,41 @@
+from mtd import Document, BACKENDS
+from time import perf_counter
+import argparse
+
+def run(path, backend):
+    # returns seconds spent in parsing, decoding cell values and building data
+    doc = Document(path, backend=backend)
+
+    start = perf_counter()
+    doc.parse()
+    parsed = perf_counter()
+    for t in doc.tables:
+        t.cell_values
+    decoded = perf_counter()
+    for t in doc.tables:
+        t.data
+    finished = perf_counter()
+
+    return parsed - start, decoded - parsed, finished - decoded, len(doc.tables)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compares MTD parser backends.')
+    parser.add_argument('mtd_paths', nargs='+')
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f'{"file":<30} {"backend":<8} {"tables":>7} {"parse":>9} {"cells":>9} {"data":>9} {"total":>9}')
+    for path in args.mtd_paths:
+        for backend in args.backends:
+            try:
+                BACKENDS[backend]()
+            except ImportError:
+                print(f'{path:<30} {backend:<8} not installed')
+                continue
+
+            # best of several runs
+            results = [run(path, backend) for _ in range(args.repeat)]
+            parse, cells, data, tables = min(results, key=lambda r: sum(r[:3]))
+            total = parse + cells + data
+            print(f'{path:<30} {backend:<8} {tables:>7} {parse:>9.3f} {cells:>9.3f} {data:>9.3f} {total:>9.3f}')
@@ -1,8 +1,14 @@
 from xml.etree import ElementTree
+from xml.parsers import expat
 from html.parser import HTMLParser
 from itertools import product, compress, chain, zip_longest, cycle, islice
 from math import ceil
-from os import remove
+from os import remove, stat
+from collections import namedtuple
+from operator import itemgetter, attrgetter
+from mmap import mmap, ACCESS_READ
+import json
+import re
 
 #####################################
 #
@@ -12,68 +18,189 @@ from os import remove
 
 class Document:
 
-    def __init__(self, path):
+    def __init__(self, path, suppression=None, backend=None):
         self.path = path
+        self.suppression = suppression
+        self.backend = get_backend(backend)
 
     def parse(self):
-        tree = ElementTree.parse(self.path)
-        node = tree.getroot().find('Tables')
-        self.tables = [Table(n, i) for i, n in enumerate(node, start=1)]
+        root = self.backend.parse(self.path)
+        node = root.find('Tables')
+        self.tables = [Table(n, i, self.suppression, self.backend) for i, n in enumerate(node, start=1)]
+
+    def parse_tables(self, *keys, table_index=None):
+        # parses only selected tables (by index or name), seeking to them
+        # via byte-offset index instead of reading the whole file
+        if table_index is None:
+            table_index = TableIndex.open(self.path)
+        entries = [table_index[k] for k in keys]
+        with open(self.path, mode='rb') as f:
+            header = f.read(table_index.tables_start)
+            fragments = []
+            for e in entries:
+                f.seek(e.start)
+                fragments.append(f.read(e.end - e.start))
+            f.seek(table_index.tables_end)
+            footer = f.read()
+        root = self.backend.fromstring(header + b''.join(fragments) + footer)
+        node = root.find('Tables')
+        self.tables = [Table(n, e.index, self.suppression, self.backend) for e, n in zip(entries, node)]
+
+    def to_frames(self):
+        return {t.name: t.to_frame() for t in self.tables}
+
+    def to_long_frame(self):
+        # pandas is optional and only needed for frame conversion
+        import pandas as pd
+        if not self.tables:
+            return pd.DataFrame(columns=['table', 'name', 'side', 'cell_item', 'top', 'value'])
+        return pd.concat([t.to_long_frame() for t in self.tables], ignore_index=True)
 
     def __repr__(self):
         return f'Document: {self.path}'
 
 class Table:
 
-    def __init__(self, xml_node, index):
+    def __init__(self, xml_node, index, suppression=None, backend=None):
         self.xml_node = xml_node
         self.index = index
+        self.suppression = suppression
+        self.backend = backend or ElementTreeBackend()
         self.name = xml_node.get('Name')
         self.description = xml_node.get('Description')
         self.is_populated = True if xml_node.get('IsPopulated') == 'true' else False
 
-        # axes
-        node = xml_node.find('Axes')
-        self.axes = [Axis(n, self) for n in node] if node else []
+        # internal - everything else is built on first access
+        self._axes = None
+        self._cell_items = None
+        self._cell_values = None
+        self._cell_values_freed = False
+        self._suppressed = None
+        self._visibility_masks = None
+        self._side_banner = None
+        self._top_banner = None
+        self._annotations = None
+        self._data = None
+        self._show_perc_signs = None
 
-        # cell items
-        node = xml_node.find('CellItems')
-        self.cell_items = [CellItem(n) for n in node] if node else []
+    @property
+    def axes(self):
+        if self._axes is None:
+            node = self.xml_node.find('Axes')
+            self._axes = [Axis(n, self) for n in node] if node is not None else []
+        return self._axes
 
-        # banner
+    @property
+    def side_axis(self):
         a = [a for a in self.axes if a.name == 'Side']
-        self.side_banner = Banner(self, a[0], self.cell_items) if a else None
+        return a[0] if a else None
+
+    @property
+    def top_axis(self):
         a = [a for a in self.axes if a.name == 'Top']
-        self.top_banner = Banner(self, a[0]) if a else None
+        return a[0] if a else None
 
-        # annotations
-        self.annotations = []
-        for n in xml_node.find('Annotations'):
-            annotation_text = n.get('Text')
-            parser = AnnotationParser(annotation_text)
-            self.annotations.append(parser.text)
+    @property
+    def cell_items(self):
+        if self._cell_items is None:
+            node = self.xml_node.find('CellItems')
+            self._cell_items = [CellItem(n) for n in node] if node is not None else []
+        return self._cell_items
 
-        # cell values - only from the 1st layer, because
-        # layers are not current supported in TOM
-        node = xml_node.find('CellValues')
-        self.cell_values = [
-            [v for v in row.attrib.values()][1:] for row in node[0]
-        ] if node else []
+    @property
+    def cell_values(self):
+        if self._cell_values is None:
+            if self._cell_values_freed:
+                raise ValueError(f'Cell values of table {self.name} have been freed')
+            self._cell_values = self.backend.cell_values(self.xml_node)
+        return self._cell_values
+
+    def free_cell_values(self):
+        # keeps data (and suppression result), drops raw cell values
+        # together with their xml subtree, so they can't be accessed later
+        self.data
+        self.backend.free_cell_values(self.xml_node)
+        self._cell_values = None
+        self._cell_values_freed = True
+
+    @property
+    def suppressed(self):
+        # empty rows/columns suppression (folded into visibility masks)
+        if self._suppressed is None:
+            if self.suppression:
+                self._suppressed = self.suppression.masks(
+                    self.cell_values, self.side_axis, self.top_axis, len(self.cell_items))
+            else:
+                self._suppressed = (None, None)
+        return self._suppressed
+
+    @property
+    def visibility_masks(self):
+        # side and top visibility masks calculated from axes,
+        # identical to banner visibility masks without building banners
+        if self._visibility_masks is None:
+            side_suppressed, top_suppressed = self.suppressed
+            side = self._visibility_mask(self.side_axis, self.cell_items, side_suppressed)
+            top = self._visibility_mask(self.top_axis, None, top_suppressed)
+            self._visibility_masks = (side, top)
+        return self._visibility_masks
+
+    @staticmethod
+    def _visibility_mask(axis, cell_items, suppressed):
+        if axis is None:
+            return None
+        scaling_factor = len(cell_items) if cell_items else 1
+        mask = [all(e.visible for e in row)
+            for row in axis.nested_elements or []
+            for _ in range(scaling_factor)]
+        if suppressed:
+            mask = [v and not s for v, s in zip(mask, suppressed)]
+        return mask
+
+    @property
+    def side_banner(self):
+        if self._side_banner is None and self.side_axis:
+            self._side_banner = Banner(self, self.side_axis, self.cell_items, self.suppressed[0])
+        return self._side_banner
 
-        # data
-        self.data = self._get_data()
+    @property
+    def top_banner(self):
+        if self._top_banner is None and self.top_axis:
+            self._top_banner = Banner(self, self.top_axis, suppressed=self.suppressed[1])
+        return self._top_banner
+
+    @property
+    def annotations(self):
+        if self._annotations is None:
+            self._annotations = []
+            for n in self.xml_node.find('Annotations'):
+                annotation_text = n.get('Text')
+                parser = AnnotationParser(annotation_text)
+                self._annotations.append(parser.text)
+        return self._annotations
 
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = self._get_data()
+        return self._data
+
+    @property
+    def show_perc_signs(self):
         # show percent signs property
-        properties = xml_node.find('Properties')
-        value = None
-        if properties:
-            for n in properties:
-                if n.find('name').text == 'ShowPercentSigns':
-                    value = n.find('value').text
-        self.show_perc_signs = value and value == '-1'
+        if self._show_perc_signs is None:
+            properties = self.xml_node.find('Properties')
+            value = None
+            if properties is not None:
+                for n in properties:
+                    if n.find('name').text == 'ShowPercentSigns':
+                        value = n.find('value').text
+            self._show_perc_signs = bool(value and value == '-1')
+        return self._show_perc_signs
 
     def _get_data(self):
         scaling_factor = len(self.cell_items)
+        side_visibility_mask, top_visibility_mask = self.visibility_masks
         
         # verticalizing data
         vertical_data = [row[i::scaling_factor]
@@ -81,21 +208,74 @@ class Table:
             for i in range(scaling_factor)]
         
         # applying visibility masks to filter out invisible data
-        if self.side_banner:
+        if side_visibility_mask is not None:
             visible_data = [row
-                for row in compress(vertical_data, self.side_banner.visibility_mask)]
+                for row in compress(vertical_data, side_visibility_mask)]
         else:
             visible_data = vertical_data
 
-        if self.top_banner:
+        if top_visibility_mask is not None:
             visible_data = [
-                list(compress(row, self.top_banner.visibility_mask))
+                list(compress(row, top_visibility_mask))
                 for row in visible_data
             ]
 
         # converting cell to numeric data types and returns
         return [[numeric(cell) for cell in row] for row in visible_data]
 
+    def to_frame(self):
+        # pandas is optional and only needed for frame conversion
+        import numpy as np
+        import pandas as pd
+
+        rows = len(self.data)
+        cols = len(self.data[0]) if self.data else 0
+        index = self._frame_index(pd, self.side_banner, rows, 'Side')
+        columns = self._frame_index(pd, self.top_banner, cols, 'Top')
+
+        # numeric block as one contiguous array, non-numeric cells ('-', '*') become NaN
+        if self.data:
+            values = np.fromiter(
+                (np.nan if isinstance(v, str) else v for v in chain.from_iterable(self.data)),
+                dtype=float, count=rows * cols).reshape(rows, cols)
+        else:
+            values = np.full((len(index), len(columns)), np.nan)
+
+        return pd.DataFrame(values, index=index, columns=columns, copy=False)
+
+    def to_long_frame(self):
+        # one line per data cell with flattened banner labels
+        import numpy as np
+        import pandas as pd
+
+        frame = self.to_frame()
+        rows, cols = frame.shape
+        side_labels = self.side_banner.labels if self.side_banner else [()] * rows
+        top_labels = self.top_banner.labels if self.top_banner else [()] * cols
+        if self.side_banner and self.cell_items:
+            cell_items = [label[-1] for label in side_labels]
+            side_labels = [label[:-1] for label in side_labels]
+        else:
+            cell_items = [''] * rows
+
+        return pd.DataFrame({
+            'table': self.index,
+            'name': self.name,
+            'side': np.repeat([' | '.join(filter(None, l)) for l in side_labels], cols),
+            'cell_item': np.repeat(cell_items, cols),
+            'top': np.tile([' | '.join(filter(None, l)) for l in top_labels], rows),
+            'value': frame.to_numpy().ravel()
+        })
+
+    @staticmethod
+    def _frame_index(pd, banner, size, name):
+        labels = banner.labels if banner else []
+        if not labels:
+            return pd.RangeIndex(size)
+        if size and len(labels) != size:
+            raise ValueError(f'{name} banner has {len(labels)} labels, but data has {size} lines')
+        return pd.MultiIndex.from_tuples(labels)
+
     @property
     def top_annotations(self):
         return self.annotations[:4]
@@ -127,18 +307,18 @@ class Axis:
         self.subaxes = [
             Axis(n, self.host, parent=self, level=self.level+1)
             for n in node
-        ] if node else []
+        ] if node is not None else []
 
         # skips axis headings, which seem not to be relevant
 
         # elements
         node = xml_node.find('Elements')
-        self.elements = [Element(n, axis=self) for n in node] if node else []
+        self.elements = [Element(n, axis=self) for n in node] if node is not None else []
 
         # element headings (deduplicated)
         node = xml_node.find('ElementHeadings')
         self.element_headings = []
-        if node:
+        if node is not None:
             for n in node:
                 element_heading = ElementHeading(n, axis=self)
                 # adds only if element heading with the same name has not been added yet
@@ -216,7 +396,7 @@ class Element:
         self.subelements = [
             Element(n, self.axis, parent=self, level=self.level+1)
             for n in node
-        ] if node else []
+        ] if node is not None else []
 
     @property
     def full_name(self):
@@ -247,7 +427,7 @@ class ElementHeading:
         self.subelement_headings = [
             ElementHeading(n, self.axis, parent=self, level=self.level+1)
             for n in node
-        ] if node else []
+        ] if node is not None else []
 
         # sets element
         self.element = [e
@@ -287,7 +467,7 @@ class CellItem:
 
 class Banner:
 
-    def __init__(self, table, axis, cell_items=None):
+    def __init__(self, table, axis, cell_items=None, suppressed=None):
         self.table = table
         self.name = axis.name
         self.cell_items = cell_items
@@ -309,10 +489,13 @@ class Banner:
             for row in elements_with_axes
             for cell_item in iterable_cell_items]
 
-        # sets and applies visibility mask
+        # sets and applies visibility mask (incl. suppressed empty lines)
         self.visibility_mask = [
             all(cell.visible for cell in row)
             for row in self.banner]
+        if suppressed:
+            self.visibility_mask = [v and not s
+                for v, s in zip(self.visibility_mask, suppressed)]
         self.banner = [row
             for row in compress(self.banner, self.visibility_mask)]
         self.height = len(self.banner)
@@ -341,6 +524,16 @@ class Banner:
         if self.name == 'Top':
             self._transpose()
 
+    @property
+    def labels(self):
+        # full labels (not blanked for merging) per banner line,
+        # followed by cell item type for banners with cell items
+        lines = zip(*self.banner) if self.name == 'Top' else self.banner
+        return [tuple((cell.object.label or cell.object.name) if cell.object else ''
+                for cell in line)
+            + ((line[0].cell_item_type,) if self.cell_items else ())
+            for line in lines]
+
     def _transpose(self):
         self.banner = [[self.banner[row][col]
                 for row in range(self.height)]
@@ -414,6 +607,69 @@ class BannerCell:
     def __repr__(self):
         return f'BannerCell: {self.label}'
 
+class Suppression:
+
+    def __init__(self, zero=True, dash=True, threshold=None, keep_base=True):
+        self.zero = zero
+        self.dash = dash
+        self.threshold = threshold
+        self.keep_base = keep_base
+
+    def is_empty(self, value):
+        value = numeric(value)
+        if isinstance(value, str):
+            return self.dash and value.strip() in ('', '-')
+        return self.zero and value == 0
+
+    def is_below_threshold(self, value):
+        value = numeric(value)
+        return self.threshold is not None and not isinstance(value, str) and value < self.threshold
+
+    def masks(self, cell_values, side_axis, top_axis, scaling_factor):
+        # returns suppressed flags for side banner lines (incl. cell items)
+        # and top banner columns, calculated from visible cells only
+        side_rows = (side_axis.nested_elements or []) if side_axis else [[]]
+        top_cols = (top_axis.nested_elements or []) if top_axis else [[]]
+        scaling_factor = scaling_factor or 1
+        width = len(top_cols) * scaling_factor
+        if not cell_values or len(cell_values) != len(side_rows) \
+            or any(len(row) != width for row in cell_values):
+            return None, None
+
+        visible_rows = [all(e.visible for e in row) for row in side_rows]
+        visible_cols = [all(e.visible for e in col) for col in top_cols]
+        empty = [[self.is_empty(v) for v in row] for row in cell_values]
+
+        # threshold applies to base values (1st cell item) of each line:
+        # side rows are checked in top base columns and vice versa
+        side_bases = [r for r in compress(range(len(side_rows)), visible_rows) if self._is_base(side_rows[r])]
+        top_bases = [c for c in compress(range(len(top_cols)), visible_cols) if self._is_base(top_cols[c])]
+        side_low = [bool(top_bases) and all(self.is_below_threshold(cell_values[r][c * scaling_factor])
+            for c in top_bases) for r in range(len(side_rows))]
+        top_low = [bool(side_bases) and all(self.is_below_threshold(cell_values[r][c * scaling_factor])
+            for r in side_bases) for c in range(len(top_cols))]
+
+        side_suppressed = [
+            (side_low[r] or all(empty[r][c * scaling_factor + k]
+                for c in compress(range(len(top_cols)), visible_cols)
+                for k in range(scaling_factor)))
+            and not (self.keep_base and self._is_base(side_rows[r]))
+            for r in range(len(side_rows))]
+        top_suppressed = [
+            (top_low[c] or all(empty[r][c * scaling_factor + k]
+                for r in compress(range(len(side_rows)), visible_rows)
+                for k in range(scaling_factor)))
+            and not (self.keep_base and self._is_base(top_cols[c]))
+            for c in range(len(top_cols))]
+
+        # side banner has one line per cell item
+        side_suppressed = [s for s in side_suppressed for _ in range(scaling_factor)]
+        return side_suppressed, top_suppressed
+
+    @staticmethod
+    def _is_base(elements):
+        return any('Base' in e.type for e in elements if e.type)
+
 class AnnotationParser(HTMLParser):
 
     def __init__(self, html):
@@ -436,12 +692,173 @@ class AnnotationParser(HTMLParser):
         if not self.ignore:
             self.text += data
 
+class CellValuesDecoder:
+
+    # decodes cell value rows by attribute name: the 1st attribute of the
+    # 1st row labels the rows, its other attributes are the value columns,
+    # which are then looked up by name (in that order) in every row
+
+    def decode(self, attribs):
+        attribs = iter(attribs)
+        first = next(attribs, None)
+        if first is None:
+            return []
+        getter = self._getter([name for name in first][1:])
+        try:
+            return [getter(first), *map(getter, attribs)]
+        except KeyError as e:
+            raise ValueError(f'Cell value row without attribute {e}') from None
+
+    @staticmethod
+    def _getter(names):
+        if len(names) > 1:
+            return itemgetter(*names)
+        elif names:
+            name = names[0]
+            return lambda attrib: (attrib[name],)
+        return lambda attrib: ()
+
+class ElementTreeBackend:
+
+    name = 'etree'
+
+    def parse(self, path):
+        return ElementTree.parse(path).getroot()
+
+    def fromstring(self, content):
+        return ElementTree.fromstring(content)
+
+    def cell_values(self, table_node):
+        # cell values - only from the 1st layer, because
+        # layers are not current supported in TOM
+        node = table_node.find('CellValues')
+        if node is None or not len(node):
+            return []
+        return CellValuesDecoder().decode(map(attrgetter('attrib'), node[0]))
+
+    def free_cell_values(self, table_node):
+        # drops row elements, the rest of the table node stays
+        node = table_node.find('CellValues')
+        if node is not None:
+            node.clear()
+
+class LxmlBackend(ElementTreeBackend):
+
+    name = 'lxml'
+
+    def __init__(self):
+        # lxml is optional, ImportError is raised if it is not installed
+        from lxml import etree
+        self.etree = etree
+        self.parser = etree.XMLParser(huge_tree=True, remove_comments=True)
+
+    def parse(self, path):
+        return self.etree.parse(path, self.parser).getroot()
+
+    def fromstring(self, content):
+        return self.etree.fromstring(content, self.parser)
+
+class CellValuesElement(ElementTree.Element):
+
+    # CellValues element of expat backend, holding decoded rows
+    # of the 1st layer instead of row elements
+    rows = None
+
+class ExpatBackend(ElementTreeBackend):
+
+    # memory oriented backend: <CellValues> rows are decoded while parsing
+    # and never become elements (about 15% less memory on large files),
+    # but parsing takes 2-3x longer than etree, because every element
+    # goes through a python callback; use etree unless memory is the limit
+
+    name = 'expat'
+
+    def parse(self, path):
+        with open(path, mode='rb') as f:
+            return self._parse(lambda parser: parser.ParseFile(f))
+
+    def fromstring(self, content):
+        return self._parse(lambda parser: parser.Parse(content, True))
+
+    def cell_values(self, table_node):
+        node = table_node.find('CellValues')
+        return node.rows or [] if node is not None else []
+
+    def free_cell_values(self, table_node):
+        node = table_node.find('CellValues')
+        if node is not None:
+            node.clear()
+            node.rows = None
+
+    def _parse(self, feed):
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+
+        # state inside <CellValues>: element, depth, layer counter and row attributes
+        cell_values, depth, layer, attribs = None, 0, 0, None
+
+        def element(tag, attrib):
+            # element factory is the only python call for regular elements,
+            # <CellValues> switches parser to row decoding handlers
+            nonlocal cell_values, depth, layer, attribs
+            if tag != 'CellValues':
+                return ElementTree.Element(tag, attrib)
+            cell_values, depth, layer, attribs = CellValuesElement(tag, attrib), 0, 0, []
+            parser.StartElementHandler = cell_values_start
+            parser.EndElementHandler = cell_values_end
+            parser.CharacterDataHandler = None
+            return cell_values
+
+        def cell_values_start(tag, attrs):
+            nonlocal depth, layer
+            depth += 1
+            if depth == 1:
+                layer += 1
+            elif depth == 2 and layer == 1:
+                attribs.append(attrs)
+
+        def cell_values_end(tag):
+            nonlocal depth
+            if depth:
+                depth -= 1
+                return
+            # leaving <CellValues>
+            cell_values.rows = CellValuesDecoder().decode(attribs)
+            builder.end(tag)
+            parser.StartElementHandler = builder.start
+            parser.EndElementHandler = builder.end
+            parser.CharacterDataHandler = builder.data
+
+        builder = ElementTree.TreeBuilder(element_factory=element)
+        parser.StartElementHandler = builder.start
+        parser.EndElementHandler = builder.end
+        parser.CharacterDataHandler = builder.data
+        feed(parser)
+        return builder.close()
+
+BACKENDS = {
+    'etree': ElementTreeBackend,
+    'lxml': LxmlBackend,
+    'expat': ExpatBackend
+}
+
+def get_backend(backend=None):
+    '''Returns parser backend instance for supplied name or instance.
+    Stdlib ElementTree is used by default as the fastest one,
+    expat trades speed for lower memory, lxml is for files too large for etree.'''
+    if backend is None:
+        return ElementTreeBackend()
+    if isinstance(backend, str):
+        return BACKENDS[backend]()
+    return backend
+
 class Partitioner:
 
-    def __init__(self, mtd_path, number_of_files=1):
+    def __init__(self, mtd_path, number_of_files=1, backend=None):
 
         self.master_path = mtd_path
         self.number_of_files = number_of_files
+        self.backend = get_backend(backend)
 
         # reads mtd as text file
         with open(self.master_path, mode='r',encoding='utf-8') as f:
@@ -458,8 +875,7 @@ class Partitioner:
         self.number_of_tables = len(self.xml_tables)
 
         # ensures that xml and text parsing lead to the same number of tables
-        tree = ElementTree.parse(self.master_path)
-        node = tree.getroot().find('Tables')
+        node = self.backend.parse(self.master_path).find('Tables')
         assert self.number_of_tables == len(node)
 
     def split(self):
@@ -485,10 +901,10 @@ class Partitioner:
         return file_names
 
     @classmethod
-    def join(cls, file_paths, master_path, clean_up=False):
+    def join(cls, file_paths, master_path, clean_up=False, backend=None):
 
         # parses files and tables
-        parsed_files = [Partitioner(f) for f in file_paths]
+        parsed_files = [Partitioner(f, backend=backend) for f in file_paths]
         tables = [t for f in parsed_files for t in f.xml_tables]
 
         # uses header and footer sections from the first file
@@ -504,6 +920,124 @@ class Partitioner:
             for f in file_paths:
                 remove(f)
 
+TableIndexEntry = namedtuple('TableIndexEntry', 'name index description start end')
+
+class TableIndex:
+
+    # matches table start tags (quoted attribute values may contain '>')
+    # and table end tags; <Tables> and </Tables> are matched separately
+    TAG_PATTERN = re.compile(rb'<Table\s(?:[^>"]|"[^"]*")*>|</Table>|<Tables>|</Tables>')
+
+    def __init__(self, mtd_path, index_path=None):
+        self.mtd_path = mtd_path
+        self.index_path = index_path or f'{mtd_path}.idx'
+        self.size = None
+        self.mtime = None
+        self.tables_start = None
+        self.tables_end = None
+        self.entries = []
+
+    @classmethod
+    def open(cls, mtd_path, index_path=None):
+        # loads sidecar index if it matches the mtd file,
+        # otherwise rebuilds and persists it
+        table_index = cls(mtd_path, index_path)
+        try:
+            table_index.load()
+        except (OSError, ValueError, KeyError, TypeError):
+            # missing or malformed sidecar is rebuilt
+            table_index = cls(mtd_path, index_path)
+        if not table_index.is_valid():
+            table_index.build()
+            try:
+                table_index.save()
+            except OSError:
+                # read-only location, in-memory index is used
+                pass
+        return table_index
+
+    def build(self):
+        s = stat(self.mtd_path)
+        self.size, self.mtime = s.st_size, s.st_mtime_ns
+        self.entries = []
+
+        # single streaming scan over memory mapped file
+        with open(self.mtd_path, mode='rb') as f, mmap(f.fileno(), 0, access=ACCESS_READ) as mm:
+            start, attrib = None, None
+            for m in self.TAG_PATTERN.finditer(mm):
+                tag = m.group()
+                if tag == b'<Tables>':
+                    self.tables_start = m.end()
+                elif tag == b'</Tables>':
+                    self.tables_end = m.start()
+                    break
+                elif tag == b'</Table>':
+                    self._add(attrib, start, m.end())
+                    start, attrib = None, None
+                elif tag.endswith(b'/>'):
+                    # self-closing (empty) table
+                    self._add(ElementTree.fromstring(tag).attrib, m.start(), m.end())
+                else:
+                    # only start tag is parsed, table body is skipped
+                    start, attrib = m.start(), ElementTree.fromstring(tag[:-1] + b'/>').attrib
+
+        if self.tables_start is None or self.tables_end is None:
+            raise ValueError(f'No <Tables> section found in {self.mtd_path}')
+
+    def _add(self, attrib, start, end):
+        self.entries.append(TableIndexEntry(
+            name=attrib.get('Name'),
+            index=len(self.entries) + 1,
+            description=attrib.get('Description'),
+            start=start,
+            end=end))
+
+    def is_valid(self):
+        try:
+            s = stat(self.mtd_path)
+        except OSError:
+            return False
+        return self.size == s.st_size and self.mtime == s.st_mtime_ns
+
+    def load(self):
+        with open(self.index_path, mode='r', encoding='utf-8') as f:
+            content = json.load(f)
+        self.size = content['size']
+        self.mtime = content['mtime']
+        self.tables_start = content['tables_start']
+        self.tables_end = content['tables_end']
+        self.entries = [TableIndexEntry(*e) for e in content['entries']]
+
+    def save(self):
+        content = {
+            'size': self.size,
+            'mtime': self.mtime,
+            'tables_start': self.tables_start,
+            'tables_end': self.tables_end,
+            'entries': [list(e) for e in self.entries]
+        }
+        with open(self.index_path, mode='w', encoding='utf-8') as f:
+            json.dump(content, f)
+
+    def __getitem__(self, key):
+        # key is either table index (starting with 1) or table name
+        if isinstance(key, int):
+            if not 1 <= key <= len(self.entries):
+                raise IndexError(key)
+            return self.entries[key - 1]
+        for e in self.entries:
+            if e.name == key:
+                return e
+        raise KeyError(key)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __repr__(self):
+        return f'TableIndex: {self.mtd_path}'
 
 def numeric(string):
     '''Parses supplied string and returns either integer or float
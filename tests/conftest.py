@@ -0,0 +1,49 @@
+import sys
+from os.path import dirname, abspath
+from random import Random
+
+import pytest
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+def _axis(name, variables, index):
+    s = f'<Axis Name="{name}" Label=""><SubAxes>'
+    for variable, n in variables:
+        s += f'<Axis Name="{variable}" Label="{variable} label"><Elements>'
+        s += '<Element Name="base" Label="Base" Type="Base"/>'
+        s += ''.join(f'<Element Name="e{i}" Label="{variable} cat {i}" Type="Category" Decimals="{(i + index) % 3}"/>'
+            for i in range(n))
+        s += '</Elements><ElementHeadings><ElementHeading Name="base"/>'
+        s += ''.join(f'<ElementHeading Name="e{i}"/>' for i in range(n))
+        s += '</ElementHeadings></Axis>'
+    return s + '</SubAxes></Axis>'
+
+def _table(index, random):
+    side, top = [('q1', 3 + index % 4), ('q2', 2)], [('gender', 2), ('age', 3)]
+    rows, cols = sum(n + 1 for _, n in side), sum(n + 1 for _, n in top)
+    # decimals and percent signs vary, so partitions register styles in different order
+    s = f'<Table Name="T{index}" Description="Table {index}" IsPopulated="true"><Axes>'
+    s += _axis('Side', side, index) + _axis('Top', top, index) + '</Axes>'
+    s += '<CellItems><CellItem Type="Count" Index="0"/>'
+    s += f'<CellItem Type="ColPercent" Index="1" Decimals="{3 - index // 2}"/></CellItems>'
+    s += '<Annotations><Annotation Text="Title &lt;br/&gt;line 2"/><Annotation Text=""/>'
+    s += '<Annotation Text=""/><Annotation Text=""/><Annotation Text="Footer"/></Annotations>'
+    s += '<CellValues><Layer>'
+    for i in range(rows):
+        values = []
+        for _ in range(cols):
+            values.append(str(random.randint(0, 50)) if random.random() > .3 else '0')
+            values.append(f'{random.random() * 100:.1f}' if random.random() > .3 else '-')
+        s += f'<Row Index="{i}" ' + ' '.join(f'C{k}="{v}"' for k, v in enumerate(values)) + '/>'
+    s += '</Layer></CellValues><Properties><Property><name>ShowPercentSigns</name>'
+    return s + f'<value>{-1 if index % 3 else 0}</value></Property></Properties></Table>'
+
+@pytest.fixture
+def mtd_path(tmp_path):
+    # synthetic mtd with banner, cell items, annotations and cell values
+    random = Random(1)
+    path = tmp_path / 'test.mtd'
+    tables = ''.join(_table(i, random) for i in range(1, 8))
+    path.write_text('<?xml version="1.0" encoding="utf-8"?>\n'
+        f'<Document><Header/><Tables>{tables}</Tables><Footer/></Document>', encoding='utf-8')
+    return str(path)
@@ -0,0 +1,32 @@
+from openpyxl import load_workbook
+
+from mtd import Document, Partitioner
+from xl import StandardExporter, WorkbookJoiner
+
+def export(mtd_path, xl_path):
+    doc = Document(mtd_path)
+    doc.parse()
+    xl = StandardExporter(doc, xl_path)
+    xl.export()
+    xl.save()
+    return xl_path
+
+def cells(workbook):
+    # values and style of every cell, plus merged ranges, per sheet
+    return {ws.title: (
+        [[(c.value, repr(c.font), repr(c.border), repr(c.alignment), repr(c.fill), c.number_format)
+            for c in row] for row in ws.iter_rows()],
+        sorted(str(r) for r in ws.merged_cells.ranges))
+        for ws in workbook.worksheets}
+
+def test_join_matches_full_export(mtd_path, tmp_path):
+    full = load_workbook(export(mtd_path, str(tmp_path / 'full.xlsx')))
+
+    # partitions number their tables from 1, joiner renumbers them
+    parts = [export(p, p.replace('.mtd', '.xlsx')) for p in Partitioner(mtd_path, 3).split()]
+    joined_path = str(tmp_path / 'joined.xlsx')
+    WorkbookJoiner.join(parts, joined_path)
+    joined = load_workbook(joined_path)
+
+    assert joined.sheetnames == full.sheetnames
+    assert cells(joined) == cells(full)
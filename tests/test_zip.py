@@ -0,0 +1,65 @@
+import zipfile
+from os.path import getsize
+
+import pytest
+
+from xl import ParallelZipWriter, CancellationToken, ExportCancelled
+
+PARTS = {
+    '[Content_Types].xml': b'<Types/>',
+    'xl/worksheets/sheet1.xml': b'<row>1</row>' * 10000,
+    'xl/worksheets/sheet2.xml': bytes(range(256)) * 100,
+    'xl/empty.xml': b'',
+}
+
+@pytest.mark.parametrize('compression_level', [0, 9])
+def test_round_trip(tmp_path, compression_level):
+    path = tmp_path / 'out.zip'
+    with ParallelZipWriter(path, compression_level, threads=2) as archive:
+        for name, data in PARTS.items():
+            archive.writestr(name, data)
+
+    with zipfile.ZipFile(path) as z:
+        assert z.testzip() is None
+        assert z.namelist() == list(PARTS)
+        assert {name: z.read(name) for name in z.namelist()} == PARTS
+        expected = zipfile.ZIP_STORED if compression_level == 0 else zipfile.ZIP_DEFLATED
+        assert all(info.compress_type == expected for info in z.infolist())
+    assert archive.compressed_size == getsize(path)
+    assert archive.uncompressed_size == sum(map(len, PARTS.values()))
+
+@pytest.mark.parametrize('compression_level', [0, 9])
+def test_streamed_part(tmp_path, monkeypatch, compression_level):
+    # parts written from files above the limit are compressed in chunks
+    monkeypatch.setattr(ParallelZipWriter, 'STREAM_PART_SIZE', 1000)
+    monkeypatch.setattr(ParallelZipWriter, 'CHUNK_SIZE', 4096)
+    source = tmp_path / 'sheet.xml'
+    source.write_bytes(PARTS['xl/worksheets/sheet1.xml'])
+    path = tmp_path / 'out.zip'
+    with ParallelZipWriter(path, compression_level) as archive:
+        archive.writestr('a.xml', b'<a/>')
+        archive.write(source, 'xl/worksheets/sheet1.xml')
+        archive.writestr('b.xml', b'<b/>')
+
+    with zipfile.ZipFile(path) as z:
+        assert z.testzip() is None
+        assert z.namelist() == ['a.xml', 'xl/worksheets/sheet1.xml', 'b.xml']
+        assert z.read('xl/worksheets/sheet1.xml') == PARTS['xl/worksheets/sheet1.xml']
+
+def test_many_parts_use_zip64(tmp_path):
+    path = tmp_path / 'out.zip'
+    with ParallelZipWriter(path, 1) as archive:
+        for i in range(ParallelZipWriter.ZIP_FILECOUNT_LIMIT + 10):
+            archive.writestr(f'p{i}.xml', b'<x/>')
+
+    with zipfile.ZipFile(path) as z:
+        assert len(z.namelist()) == ParallelZipWriter.ZIP_FILECOUNT_LIMIT + 10
+        assert z.read(f'p{ParallelZipWriter.ZIP_FILECOUNT_LIMIT + 9}.xml') == b'<x/>'
+
+def test_cancelled(tmp_path):
+    cancellation = CancellationToken()
+    with pytest.raises(ExportCancelled):
+        with ParallelZipWriter(tmp_path / 'out.zip', 6, cancellation=cancellation) as archive:
+            archive.writestr('a.xml', b'<a/>')
+            cancellation.cancel()
+            archive.writestr('b.xml', b'<b/>')
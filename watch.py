@@ -0,0 +1,176 @@
+from mtd import Document
+from xl import StandardExporter
+from multiprocessing import Pool, cpu_count
+from collections import deque, OrderedDict
+from threading import Lock, current_thread, main_thread
+from os import scandir, replace
+from os.path import join, splitext, basename
+from time import time, sleep
+from signal import signal, SIGINT, SIGTERM, SIG_IGN
+import argparse
+import json
+
+def init_worker():
+    # interruption is handled by the watcher, which lets workers finish current files
+    signal(SIGINT, SIG_IGN)
+    signal(SIGTERM, SIG_IGN)
+
+def convert(mtd_path, xl_path):
+    # runs in a warm worker process: mtd and xl are already imported
+    start = time()
+    doc = Document(mtd_path)
+    doc.parse()
+    xl = StandardExporter(doc, xl_path)
+    xl.export()
+    xl.save()
+    return len(doc.tables), time() - start
+
+class Watcher:
+
+    def __init__(self, watch_dir, output_dir=None, workers=None,
+        interval=1.0, debounce=2.0, status_path=None, history=20):
+
+        self.watch_dir = watch_dir
+        self.output_dir = output_dir or watch_dir
+        self.workers = workers or cpu_count()
+        self.interval = interval
+        self.debounce = debounce
+        self.status_path = status_path or join(self.output_dir, 'status.json')
+        self.running = False
+
+        # path -> (size, mtime) of files queued or processed, used for de-duplication
+        self.seen = {}
+        # path -> ((size, mtime), first seen) of files still being written
+        self.candidates = {}
+        # path -> detected time, for queued and running files
+        self.queue = OrderedDict()
+        self.in_progress = {}
+
+        # metrics
+        self.lock = Lock()
+        self.started = time()
+        self.processed = 0
+        self.failed = 0
+        self.completions = deque()
+        self.recent = deque(maxlen=history)
+
+    def run(self):
+        self.running = True
+        if current_thread() is main_thread():
+            signal(SIGTERM, lambda signum, frame: self.stop())
+        pool = Pool(self.workers, initializer=init_worker)
+        try:
+            while self.running:
+                self.scan()
+                self.dispatch(pool)
+                self.write_status()
+                sleep(self.interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            pool.close()
+            pool.join()
+            self.write_status()
+
+    def stop(self):
+        self.running = False
+
+    def scan(self):
+        now = time()
+        for entry in scandir(self.watch_dir):
+            if not entry.is_file() or splitext(entry.name)[1].lower() != '.mtd':
+                continue
+            s = entry.stat()
+            signature = (s.st_size, s.st_mtime_ns)
+
+            # skips files already queued or processed in the same version
+            if self.seen.get(entry.path) == signature:
+                continue
+
+            # debounce: file has to stay unchanged before it gets queued
+            candidate = self.candidates.get(entry.path)
+            if candidate is None or candidate[0] != signature:
+                self.candidates[entry.path] = (signature, now)
+            elif now - candidate[1] >= self.debounce:
+                del self.candidates[entry.path]
+                self.seen[entry.path] = signature
+                self.queue.pop(entry.path, None)
+                self.queue[entry.path] = now
+
+    def dispatch(self, pool):
+        with self.lock:
+            for mtd_path in list(self.queue):
+                if len(self.in_progress) >= self.workers:
+                    break
+                # a file changed during conversion stays queued
+                # until its running job has finished
+                if mtd_path in self.in_progress:
+                    continue
+                detected = self.queue.pop(mtd_path)
+                self.in_progress[mtd_path] = detected
+                pool.apply_async(convert, (mtd_path, self._xl_path(mtd_path)),
+                    callback=lambda result, p=mtd_path: self._finished(p, result),
+                    error_callback=lambda error, p=mtd_path: self._failed(p, error))
+
+    def _xl_path(self, mtd_path):
+        name = splitext(basename(mtd_path))[0]
+        return join(self.output_dir, f'{name}.xlsx')
+
+    def _finished(self, mtd_path, result):
+        number_of_tables, seconds = result
+        now = time()
+        with self.lock:
+            detected = self.in_progress.pop(mtd_path, now)
+            self.processed += 1
+            self.completions.append((now, number_of_tables))
+            self.recent.append({
+                'file': mtd_path,
+                'tables': number_of_tables,
+                'seconds': round(seconds, 3),
+                'latency': round(now - detected, 3)
+            })
+
+    def _failed(self, mtd_path, error):
+        with self.lock:
+            self.in_progress.pop(mtd_path, None)
+            self.failed += 1
+            self.recent.append({'file': mtd_path, 'error': repr(error)})
+
+    def status(self, window=60):
+        now = time()
+        with self.lock:
+            # rolling throughput over the last window seconds
+            while self.completions and now - self.completions[0][0] > window:
+                self.completions.popleft()
+            tables = sum(n for _, n in self.completions)
+            elapsed = min(window, now - self.started) or 1
+            return {
+                'queue_depth': len(self.queue),
+                'in_progress': len(self.in_progress),
+                'pending': len(self.candidates),
+                'processed': self.processed,
+                'failed': self.failed,
+                'tables_per_second': round(tables / elapsed, 3),
+                'uptime': round(now - self.started, 3),
+                'recent': list(self.recent)
+            }
+
+    def write_status(self):
+        # writes to temporary file first, so readers never see partial content
+        temp_path = f'{self.status_path}.tmp'
+        with open(temp_path, mode='w', encoding='utf-8') as f:
+            json.dump(self.status(), f, indent=2)
+        replace(temp_path, self.status_path)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Watches directory and exports arriving MTD files to xlsx.')
+    parser.add_argument('watch_dir')
+    parser.add_argument('--output-dir')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--interval', type=float, default=1.0)
+    parser.add_argument('--debounce', type=float, default=2.0)
+    parser.add_argument('--status-path')
+    args = parser.parse_args()
+
+    Watcher(args.watch_dir, args.output_dir, args.workers,
+        args.interval, args.debounce, args.status_path).run()
@@ -1,44 +1,177 @@
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Border, Alignment, Side
-from collections import namedtuple
+from openpyxl.writer.excel import ExcelWriter
+from mtd import Banner
+from collections import namedtuple, deque
+from copy import copy
+from itertools import product
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+from zipfile import ZipFile, ZIP_DEFLATED, ZIP_STORED
+from os import remove, replace
+from os.path import exists, getsize
+from time import time, localtime
+import zipfile
+import struct
+import zlib
+import re
 
 class StandardExporter:
 
-    def __init__(self, mtd_document, xl_path):
+    def __init__(self, mtd_document, xl_path, callback=None, cancellation=None):
         self.mtd = mtd_document
         self.xl_path = xl_path
         self.workbook = Workbook()
+        # total is known once export starts, document may not be parsed yet
+        self.progress = ExportProgress(None, callback)
+        self.cancellation = cancellation or CancellationToken()
 
     def export(self):
+        self.progress.total = len(self.mtd.tables)
         for t in self.mtd.tables:
+            self.cancellation.check()
+            self.progress.table_started(t)
 
-            styles = StandardStyles
-            layout = StandardLayout(t)
-            content = StandardContent(t)
+            # oversized tables are split into independent blocks
+            # rendered on T{index}, T{index}_2, ... sheets
+            for title, block in TableSplitter(t).blocks():
+                styles = StandardStyles
+                layout = StandardLayout(block)
+                content = StandardContent(block)
 
-            ws = self.workbook.create_sheet()
-            writer = WorksheetWriter(ws, t, layout, content, styles)
-            writer.write()
-            writer.merge_cells()
-            writer.format()
+                ws = self.workbook.create_sheet()
+                writer = WorksheetWriter(ws, block, layout, content, styles, title)
+                writer.write()
+                self.cancellation.check()
+                writer.merge_cells()
+                self.cancellation.check()
+                writer.format()
+                self.cancellation.check()
+
+            self.progress.table_finished(t)
 
         # remove first (default) sheet
         first_sheet = self.workbook['Sheet']
         self.workbook.remove(first_sheet)
 
-    def save(self):
-        self.workbook.save(self.xl_path)
+    def save(self, compression_level=None, threads=None):
+        # writes to temporary file first, so that cancelled or failed
+        # saves never leave a half-written xlsx behind
+        self.cancellation.check()
+        self.progress.save_started()
+        temp_path = f'{self.xl_path}.tmp'
+        try:
+            self._save(temp_path, compression_level, threads)
+            replace(temp_path, self.xl_path)
+        finally:
+            if exists(temp_path):
+                remove(temp_path)
+        self.progress.save_finished(self.save_stats['total'])
+
+    def _save(self, path, compression_level, threads):
+        # compression_level None keeps openpyxl's default deflate,
+        # otherwise 0 (stored) to 9 (maximum) with parts compressed in threads
+        start = time()
+        if compression_level is None:
+            self.workbook.save(path)
+            self.save_stats = {'total': time() - start}
+            return
+
+        # parts are compressed in threads while the workbook is being serialized
+        with ParallelZipWriter(path, compression_level, threads, self.cancellation) as archive:
+            ExcelWriter(self.workbook, archive).save()
+
+        total = time() - start
+        self.save_stats = {
+            'serialize': total - archive.busy_time,
+            'compress': archive.compress_time,
+            'compress_wait': archive.wait_time,
+            'write': archive.write_time,
+            'total': total,
+            'uncompressed_size': archive.uncompressed_size,
+            'compressed_size': archive.compressed_size
+        }
+
+class ExportCancelled(Exception):
+    pass
+
+class CancellationToken:
+
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def check(self):
+        if self.cancelled:
+            raise ExportCancelled()
+
+class ExportProgress:
+
+    def __init__(self, total, callback=None, window=20):
+        self.total = total
+        self.callback = callback
+        self.finished = 0
+        self.table_start = None
+        # (finish time, elapsed) of the last tables for rolling throughput
+        self.recent = deque(maxlen=window)
+
+    @property
+    def tables_per_second(self):
+        elapsed = sum(e for _, e in self.recent)
+        return len(self.recent) / elapsed if elapsed else 0.0
+
+    @property
+    def eta(self):
+        rate = self.tables_per_second
+        return (self.total - self.finished) / rate if rate and self.total is not None else None
+
+    def table_started(self, table):
+        self.table_start = time()
+        self._emit('table_started', table)
+
+    def table_finished(self, table):
+        now = time()
+        elapsed = now - self.table_start
+        self.finished += 1
+        self.recent.append((now, elapsed))
+        rows = len(table.data)
+        cols = len(table.data[0]) if table.data else 0
+        self._emit('table_finished', table, rows, cols, rows * cols, elapsed)
+
+    def save_started(self):
+        self._emit('save_started')
+
+    def save_finished(self, elapsed):
+        self._emit('save_finished', elapsed=elapsed)
+
+    def _emit(self, name, table=None, rows=None, cols=None, cells=None, elapsed=None):
+        if self.callback:
+            self.callback(ExportEvent(
+                name=name,
+                table_index=table.index if table else None,
+                table_name=table.name if table else None,
+                finished=self.finished,
+                total=self.total,
+                rows=rows,
+                cols=cols,
+                cells=cells,
+                elapsed=elapsed,
+                tables_per_second=self.tables_per_second,
+                eta=self.eta))
 
 class WorksheetWriter:
 
-    def __init__(self, worksheet, table, layout, content, styles):
+    def __init__(self, worksheet, table, layout, content, styles, title=None):
         self.worksheet = worksheet
         self.table = table
         self.layout = layout
         self.content = content
         self.styles = styles
 
-        self.worksheet.title = f'T{table.index}'
+        self.worksheet.title = title or f'T{table.index}'
 
         # creates ranges with content dictionary
         self.ranges_with_content = {}
@@ -107,26 +240,44 @@ class WorksheetWriter:
             self._format_annotation(self.layout.bottom_annotation)
 
     def _format_annotation(self, _range):
-        for row in range(_range.x1, _range.x2 + 1):
-            for col in range(_range.y1, _range.y2 + 1):
-                cell = self.worksheet.cell(column=col, row=row)
-                style = self.styles.annotation()
-                style.apply(cell)
+        style = self.styles.annotation()
+        style.apply_range(self.worksheet, _range)
 
     def _format_banner(self, _range, banner):
-        for i, row in enumerate(range(_range.x1, _range.x2 + 1)):
-            for j, col in enumerate(range(_range.y1, _range.y2 + 1)):
-                cell = self.worksheet.cell(column=col, row=row)
-                banner_cell = banner.banner[i][j]
-                if banner_cell.type == 'Axis':
-                    style = self.styles.banner_axis(banner_cell)
-                    style.apply(cell)
-                elif banner_cell.type == 'Element':
-                    style = self.styles.banner_element(banner_cell)
-                    style.apply(cell)
-                elif banner_cell.type == '':
-                    style = self.styles.banner_empty(banner_cell)
-                    style.apply(cell)
+        # styles are computed once per distinct banner cell style key and
+        # applied to maximal uniform runs along banner lines
+        # (rows for top banner, columns for side banner)
+        styles = {}
+        keys = [[self._banner_style_key(cell) for cell in row] for row in banner.banner]
+        if banner.name == 'Top':
+            lines = [(i, None) for i in range(len(keys))]
+        else:
+            lines = [(None, j) for j in range(len(keys[0]) if keys else 0)]
+
+        for i, j in lines:
+            line = keys[i] if j is None else [row[j] for row in keys]
+            for start, end in self._runs(line):
+                key = line[start]
+                if key[0] not in ('Axis', 'Element', ''):
+                    continue
+                cell = banner.banner[i][start] if j is None else banner.banner[start][j]
+                if key not in styles:
+                    if key[0] == 'Axis':
+                        styles[key] = self.styles.banner_axis(cell)
+                    elif key[0] == 'Element':
+                        styles[key] = self.styles.banner_element(cell)
+                    else:
+                        styles[key] = self.styles.banner_empty(cell)
+                if j is None:
+                    r = Range(_range.x1 + i, _range.y1 + start, _range.x1 + i, _range.y1 + end)
+                else:
+                    r = Range(_range.x1 + start, _range.y1 + j, _range.x1 + end, _range.y1 + j)
+                styles[key].apply_range(self.worksheet, r)
+
+    @staticmethod
+    def _banner_style_key(cell):
+        is_base = 'Base' in cell.object.type if cell.type == 'Element' and cell.object.type else False
+        return (cell.type, cell.element_level, is_base, cell.first)
 
     def _format_data(self):
 
@@ -137,17 +288,38 @@ class WorksheetWriter:
         side_first_mask = self.table.side_banner.first_mask if self.table.side_banner else [False] * (r.x2 - r.x1 + 1)
         side_cell_items_mask = self.table.side_banner.cell_items_mask if self.table.side_banner else [False] * (r.x2 - r.x1 + 1)
         side_last_element_mask = self.table.side_banner.last_element_mask if self.table.side_banner else [False] * (r.x2 - r.x1 + 1)
-        for i, row in enumerate(range(r.x1, r.x2 + 1)):
-            for j, col in enumerate(range(r.y1, r.y2 + 1)):
-                cell = self.worksheet.cell(column=col, row=row)
-                is_base = any((side_base_mask[i], top_base_mask[j]))
-                is_top_first = top_first_mask[j]
-                is_side_first = side_first_mask[i]
-                cell_item = side_cell_items_mask[i]
-                last_element = side_last_element_mask[i]
-                show_perc = self.table.show_perc_signs
-                style = self.styles.data_cell(cell, is_base, is_top_first, is_side_first, cell_item, last_element, show_perc)
-                style.apply(cell)
+        show_perc = self.table.show_perc_signs
+
+        # formatting is constant across rectangular blocks of rows
+        # and columns with the same mask values
+        row_keys = [
+            (side_base_mask[i], side_first_mask[i], side_cell_items_mask[i], side_last_element_mask[i].decimals)
+            for i in range(r.x2 - r.x1 + 1)]
+        col_keys = [
+            (top_base_mask[j], top_first_mask[j])
+            for j in range(r.y2 - r.y1 + 1)]
+        col_runs = self._runs(col_keys)
+
+        for i1, i2 in self._runs(row_keys):
+            for j1, j2 in col_runs:
+                is_base = any((side_base_mask[i1], top_base_mask[j1]))
+                is_top_first = top_first_mask[j1]
+                is_side_first = side_first_mask[i1]
+                cell_item = side_cell_items_mask[i1]
+                last_element = side_last_element_mask[i1]
+                style = self.styles.data_cell(None, is_base, is_top_first, is_side_first, cell_item, last_element, show_perc)
+                style.apply_range(self.worksheet, Range(r.x1 + i1, r.y1 + j1, r.x1 + i2, r.y1 + j2))
+
+    @staticmethod
+    def _runs(keys):
+        # returns (start, end) index pairs of maximal runs of equal keys
+        runs = []
+        start = 0
+        for i in range(1, len(keys) + 1):
+            if i == len(keys) or keys[i] != keys[start]:
+                runs.append((start, i - 1))
+                start = i
+        return runs
 
     def _get_merged_cells(self, banner):
         
@@ -254,6 +426,128 @@ class StandardLayout:
         else:
             self.bottom_annotation = None
 
+class TableSplitter:
+
+    # Excel worksheet limits
+    MAX_ROWS = 1048576
+    MAX_COLS = 16384
+
+    def __init__(self, table, max_rows=None, max_cols=None):
+        self.table = table
+        self.max_rows = max_rows or self.MAX_ROWS
+        self.max_cols = max_cols or self.MAX_COLS
+
+        # rows and columns not used by side banner/data (same as in StandardLayout)
+        top_annotations = [sub for a in table.top_annotations for sub in a.split('\n') if a]
+        bottom_annotations = [sub for a in table.bottom_annotations for sub in a.split('\n') if a]
+        fixed_rows = len(top_annotations) + 1 if top_annotations else 0
+        fixed_rows += table.top_banner.height if table.top_banner else 0
+        fixed_rows += len(bottom_annotations) + 1 if bottom_annotations else 0
+        fixed_cols = table.side_banner.width if table.side_banner else 0
+
+        # dimensions are calculated from banners, before anything is rendered
+        self.height = table.side_banner.height if table.side_banner else len(table.data)
+        self.width = table.top_banner.width if table.top_banner else len(table.data[0]) if table.data else 0
+        self.available_rows = self.max_rows - fixed_rows
+        self.available_cols = self.max_cols - fixed_cols
+
+    @property
+    def is_oversized(self):
+        return self.height > self.available_rows or self.width > self.available_cols
+
+    def blocks(self):
+        # returns list of (sheet title, table or table block)
+        if not self.is_oversized:
+            return [(f'T{self.table.index}', self.table)]
+
+        side, top = self.table.side_banner, self.table.top_banner
+        scaling_factor = side.scaling_factor if side else 1
+        row_blocks = self._split(side.first_mask if side else None, self.height, self.available_rows, scaling_factor)
+        col_blocks = self._split(top.first_mask if top else None, self.width, self.available_cols, 1)
+
+        blocks = []
+        for n, (rows, cols) in enumerate(product(row_blocks, col_blocks), start=1):
+            title = f'T{self.table.index}' if n == 1 else f'T{self.table.index}_{n}'
+            is_last = rows == row_blocks[-1] and cols == col_blocks[-1]
+            blocks.append((title, TableBlock(self.table, rows, cols, is_last)))
+        return blocks
+
+    @staticmethod
+    def _split(first_mask, size, limit, step):
+        # splits lines into (start, end) blocks of maximum limit lines,
+        # preferably on group boundaries (first_mask), otherwise on step
+        if limit < step:
+            raise ValueError(f'No space left for table content ({limit} lines available)')
+        boundaries = [i for i in range(step, size, step) if first_mask is None or first_mask[i]]
+        blocks = []
+        start = 0
+        while size - start > limit:
+            cuts = [b for b in boundaries if start < b <= start + limit]
+            cut = cuts[-1] if cuts else start + limit - limit % step
+            blocks.append((start, cut))
+            start = cut
+        blocks.append((start, size))
+        return blocks
+
+class TableBlock:
+
+    def __init__(self, table, rows, cols, is_last=True):
+        # rectangular part of a table, rendered on its own sheet
+        # with repeated banner headers and top annotations
+        r1, r2 = rows
+        c1, c2 = cols
+        self.table = table
+        self.index = table.index
+        self.name = table.name
+        self.show_perc_signs = table.show_perc_signs
+        self.top_annotations = table.top_annotations
+        self.bottom_annotations = table.bottom_annotations if is_last else []
+        self.side_banner = BannerBlock(table.side_banner, r1, r2) if table.side_banner else None
+        self.top_banner = BannerBlock(table.top_banner, c1, c2) if table.top_banner else None
+        self.data = [row[c1:c2] for row in table.data[r1:r2]]
+
+    def __repr__(self):
+        return f'TableBlock: {self.name}'
+
+class BannerBlock(Banner):
+
+    def __init__(self, banner, start, end):
+        # slice of banner lines: rows of side banner, columns of top banner
+        self.table = banner.table
+        self.name = banner.name
+        self.cell_items = banner.cell_items
+        self.scaling_factor = banner.scaling_factor
+
+        if self.name == 'Top':
+            self.banner = [row[start:end] for row in banner.banner]
+            first_line = [row[0] for row in self.banner]
+        else:
+            self.banner = banner.banner[start:end]
+            first_line = self.banner[0] if self.banner else []
+        self.height = len(self.banner)
+        self.width = len(self.banner[0]) if self.banner else 0
+
+        # first line of the block shows all labels and starts a new group,
+        # banner cells are copied, so that the original banner is untouched
+        first_line = [copy(cell) for cell in first_line]
+        for cell in first_line:
+            cell.label = cell.object.label if cell.object else ''
+            cell.first = True
+        if self.name == 'Top':
+            for row, cell in zip(self.banner, first_line):
+                row[0] = cell
+        elif self.banner:
+            self.banner[0] = first_line
+
+        self.first_mask = [True] + banner.first_mask[start + 1:end]
+        self.last_mask = banner.last_mask[start:end]
+        self.base_mask = banner.base_mask[start:end]
+        self.cell_items_mask = banner.cell_items_mask[start:end]
+        self.last_element_mask = banner.last_element_mask[start:end]
+
+    def __repr__(self):
+        return f'BannerBlock: {self.name}'
+
 class StandardContent:
      
     def __init__(self, table):
@@ -374,6 +668,17 @@ class CellStyle:
         self.alignment = alignment
         self.number_format = number_format
 
+    def apply_range(self, worksheet, _range):
+        # styles top left cell only and shares its style array
+        # with the rest of the range instead of restyling every cell
+        first = worksheet.cell(row=_range.x1, column=_range.y1)
+        self.apply(first)
+        for row in worksheet.iter_rows(min_row=_range.x1, max_row=_range.x2,
+                min_col=_range.y1, max_col=_range.y2):
+            for cell in row:
+                if cell is not first:
+                    cell._style = copy(first._style)
+
     def apply(self, cell):
         if self.font:
             cell.font = self.font
@@ -386,4 +691,531 @@ class CellStyle:
         if self.number_format:
             cell.number_format = self.number_format
 
-Range = namedtuple('Range', 'x1 y1 x2 y2')
\ No newline at end of file
+class WorkbookJoiner:
+
+    MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+    REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+    WORKSHEET_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml'
+    CONTENT_TYPES = {
+        '/xl/workbook.xml': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml',
+        '/xl/styles.xml': 'application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml',
+        '/xl/sharedStrings.xml': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml',
+        '/xl/theme/theme1.xml': 'application/vnd.openxmlformats-officedocument.theme+xml',
+        '/docProps/core.xml': 'application/vnd.openxmlformats-package.core-properties+xml',
+        '/docProps/app.xml': 'application/vnd.openxmlformats-officedocument.extended-properties+xml',
+    }
+
+    # cells, rows and columns carrying style (and shared string) references
+    STYLED_TAG_PATTERN = re.compile(rb'<(c|row|col)\b([^>]*)>(?:<v>(\d+)</v>)?')
+    STYLE_ATTRIBUTE_PATTERN = re.compile(rb'\b(s|style)="(\d+)"')
+    SHEET_NAME_PATTERN = re.compile(r'T(\d+)(?:_(\d+))?$')
+    CHUNK_SIZE = 1 << 20
+
+    def __init__(self, file_paths, master_path):
+        self.file_paths = file_paths
+        self.master_path = master_path
+
+        # merged style components and their deduplication lookups
+        self.num_fmts, self.num_fmt_lookup = [], {}
+        self.fonts, self.font_lookup = [], {}
+        self.fills, self.fill_lookup = [], {}
+        self.borders, self.border_lookup = [], {}
+        self.cell_xfs, self.cell_xf_lookup = [], {}
+        self.shared_strings, self.shared_string_lookup = [], {}
+        self.stylesheet = None
+
+        # sheets as (sort key, file index, sheet name, part name) tuples
+        self.sheets = []
+        # per file mapping of old style/shared string index to new one
+        self.style_maps = []
+        self.shared_string_maps = []
+
+    @classmethod
+    def join(cls, file_paths, master_path, clean_up=False):
+        joiner = cls(file_paths, master_path)
+        joiner.merge()
+        joiner.write()
+
+        # delete all partitioned files
+        if clean_up:
+            for f in file_paths:
+                remove(f)
+
+    def merge(self):
+        # 1st pass: merges small workbook level parts only,
+        # sheet parts are streamed later during write
+        for i, path in enumerate(self.file_paths):
+            with ZipFile(path) as z:
+                self.sheets.extend((self._sort_key(name, i, j), i, name, part)
+                    for j, (name, part) in enumerate(self._read_sheets(z)))
+                self.style_maps.append(self._merge_styles(z.read('xl/styles.xml')))
+                if 'xl/sharedStrings.xml' in z.namelist():
+                    self.shared_string_maps.append(self._merge_shared_strings(z.read('xl/sharedStrings.xml')))
+                else:
+                    self.shared_string_maps.append({})
+
+        # shards exported separately number their tables from 1,
+        # so duplicate names get renumbered after the preceding files
+        names = [name for _, _, name, _ in self.sheets]
+        if len(set(names)) != len(names):
+            self._renumber()
+        self.sheets.sort()
+
+    def _renumber(self):
+        offset, sheets = 0, []
+        for i in range(len(self.file_paths)):
+            file_sheets = [s for s in self.sheets if s[1] == i]
+            last_index = 0
+            for key, _, name, part in file_sheets:
+                m = self.SHEET_NAME_PATTERN.match(name)
+                if m:
+                    index = int(m.group(1))
+                    last_index = max(last_index, index)
+                    name = f'T{offset + index}' + (f'_{m.group(2)}' if m.group(2) else '')
+                    key = self._sort_key(name, *key[-2:])
+                sheets.append((key, i, name, part))
+            offset += last_index
+        self.sheets = sheets
+
+    def write(self):
+        # writes to temporary file first, so that failed joins
+        # never leave a half-written xlsx behind
+        temp_path = f'{self.master_path}.tmp'
+        try:
+            self._write(temp_path)
+            replace(temp_path, self.master_path)
+        finally:
+            if exists(temp_path):
+                remove(temp_path)
+
+    def _write(self, path):
+        with ZipFile(path, mode='w', compression=ZIP_DEFLATED) as out:
+            # parts without sheet references are taken from the first file
+            copied = []
+            with ZipFile(self.file_paths[0]) as first:
+                for name in ('_rels/.rels', 'docProps/app.xml', 'docProps/core.xml', 'xl/theme/theme1.xml'):
+                    if name in first.namelist():
+                        out.writestr(name, first.read(name))
+                        copied.append(f'/{name}')
+                workbook_xml = first.read('xl/workbook.xml')
+
+            out.writestr('[Content_Types].xml', self._content_types(copied))
+            out.writestr('xl/workbook.xml', self._workbook(workbook_xml))
+            out.writestr('xl/_rels/workbook.xml.rels', self._workbook_rels(copied))
+            out.writestr('xl/styles.xml', self._styles())
+            if self.shared_strings:
+                out.writestr('xl/sharedStrings.xml', self._shared_strings())
+
+            # streams sheet parts one by one in T{index} order
+            sources = {}
+            try:
+                for n, (_, i, _, part) in enumerate(self.sheets, start=1):
+                    if i not in sources:
+                        sources[i] = ZipFile(self.file_paths[i])
+                    with sources[i].open(part) as src, out.open(f'xl/worksheets/sheet{n}.xml', mode='w', force_zip64=True) as dst:
+                        for chunk in self._iter_rows(src):
+                            if n > 1:
+                                chunk = chunk.replace(b'tabSelected="1"', b'tabSelected="0"')
+                            dst.write(self._remap(chunk, i))
+            finally:
+                for z in sources.values():
+                    z.close()
+
+    def _read_sheets(self, z):
+        # resolves sheet names to sheet parts via workbook relationships
+        rels = ElementTree.fromstring(z.read('xl/_rels/workbook.xml.rels'))
+        targets = {r.get('Id'): r.get('Target') for r in rels}
+        workbook = ElementTree.fromstring(z.read('xl/workbook.xml'))
+        for sheet in workbook.find(f'{{{self.MAIN_NS}}}sheets'):
+            target = targets[sheet.get(f'{{{self.REL_NS}}}id')]
+            part = target.lstrip('/') if target.startswith('/') else f'xl/{target}'
+            yield sheet.get('name'), part
+
+    def _sort_key(self, name, file_index, sheet_index):
+        # T{index}(_{part}) sheets are ordered by table index,
+        # other sheets keep their original order
+        m = self.SHEET_NAME_PATTERN.match(name)
+        if m:
+            return (0, int(m.group(1)), int(m.group(2) or 1), file_index, sheet_index)
+        return (1, 0, 0, file_index, sheet_index)
+
+    def _add(self, items, lookup, element):
+        key = ElementTree.tostring(element)
+        if key not in lookup:
+            lookup[key] = len(items)
+            items.append(element)
+        return lookup[key]
+
+    def _merge_styles(self, xml):
+        ns = {'m': self.MAIN_NS}
+        stylesheet = ElementTree.fromstring(xml)
+        if self.stylesheet is None:
+            self.stylesheet = stylesheet
+
+        # custom number formats are matched by format code
+        num_fmt_map = {}
+        for e in stylesheet.iterfind('m:numFmts/m:numFmt', ns):
+            code = e.get('formatCode')
+            if code not in self.num_fmt_lookup:
+                self.num_fmt_lookup[code] = 164 + len(self.num_fmts)
+                self.num_fmts.append(code)
+            num_fmt_map[e.get('numFmtId')] = str(self.num_fmt_lookup[code])
+
+        font_map = [self._add(self.fonts, self.font_lookup, e) for e in stylesheet.iterfind('m:fonts/m:font', ns)]
+        fill_map = [self._add(self.fills, self.fill_lookup, e) for e in stylesheet.iterfind('m:fills/m:fill', ns)]
+        border_map = [self._add(self.borders, self.border_lookup, e) for e in stylesheet.iterfind('m:borders/m:border', ns)]
+
+        # remaps cell formats to merged components
+        style_map = {}
+        for i, e in enumerate(stylesheet.iterfind('m:cellXfs/m:xf', ns)):
+            num_fmt_id = e.get('numFmtId', '0')
+            e.set('numFmtId', num_fmt_map.get(num_fmt_id, num_fmt_id))
+            e.set('fontId', str(font_map[int(e.get('fontId', 0))]))
+            e.set('fillId', str(fill_map[int(e.get('fillId', 0))]))
+            e.set('borderId', str(border_map[int(e.get('borderId', 0))]))
+            style_map[str(i).encode()] = str(self._add(self.cell_xfs, self.cell_xf_lookup, e)).encode()
+        return style_map
+
+    def _merge_shared_strings(self, xml):
+        sst = ElementTree.fromstring(xml)
+        return {str(i).encode(): str(self._add(self.shared_strings, self.shared_string_lookup, e)).encode()
+            for i, e in enumerate(sst)}
+
+    def _iter_rows(self, stream):
+        # yields chunks ending on row boundaries, so that no tag is split
+        pending = b''
+        while True:
+            data = stream.read(self.CHUNK_SIZE)
+            if not data:
+                break
+            pending += data
+            cut = pending.rfind(b'</row>')
+            if cut != -1:
+                cut += len(b'</row>')
+                yield pending[:cut]
+                pending = pending[cut:]
+        if pending:
+            yield pending
+
+    def _remap(self, chunk, file_index):
+        style_map = self.style_maps[file_index]
+        shared_string_map = self.shared_string_maps[file_index]
+
+        def remap_style(m):
+            return m.group(1) + b'="' + style_map.get(m.group(2), m.group(2)) + b'"'
+
+        def remap_tag(m):
+            tag, attributes, value = m.groups()
+            attributes = self.STYLE_ATTRIBUTE_PATTERN.sub(remap_style, attributes)
+            result = b'<' + tag + attributes + b'>'
+            if value is not None:
+                if tag == b'c' and b't="s"' in attributes:
+                    value = shared_string_map.get(value, value)
+                result += b'<v>' + value + b'</v>'
+            return result
+
+        return self.STYLED_TAG_PATTERN.sub(remap_tag, chunk)
+
+    def _collection(self, tag, items):
+        collection = ElementTree.Element(f'{{{self.MAIN_NS}}}{tag}', count=str(len(items)))
+        collection.extend(items)
+        return collection
+
+    def _styles(self):
+        # rebuilds stylesheet of the first file with merged components
+        stylesheet = self.stylesheet
+        num_fmts = [ElementTree.Element(f'{{{self.MAIN_NS}}}numFmt', numFmtId=str(164 + i), formatCode=code)
+            for i, code in enumerate(self.num_fmts)]
+        replacements = {
+            'numFmts': self._collection('numFmts', num_fmts) if num_fmts else None,
+            'fonts': self._collection('fonts', self.fonts),
+            'fills': self._collection('fills', self.fills),
+            'borders': self._collection('borders', self.borders),
+            'cellXfs': self._collection('cellXfs', self.cell_xfs),
+        }
+        # keeps schema order of the original stylesheet
+        children = []
+        for e in stylesheet:
+            tag = e.tag.replace(f'{{{self.MAIN_NS}}}', '')
+            if tag in replacements:
+                e = replacements.pop(tag)
+            if e is not None:
+                children.append(e)
+        if replacements.get('numFmts') is not None:
+            children.insert(0, replacements['numFmts'])
+        stylesheet[:] = children
+        return self._tostring(stylesheet)
+
+    def _shared_strings(self):
+        sst = self._collection('sst', self.shared_strings)
+        sst.set('uniqueCount', str(len(self.shared_strings)))
+        return self._tostring(sst)
+
+    def _tostring(self, root):
+        # serializes main namespace as the default one without registering it
+        # globally (default_namespace option rejects unqualified attributes)
+        prefix = f'{{{self.MAIN_NS}}}'
+        for e in root.iter():
+            if e.tag.startswith(prefix):
+                e.tag = e.tag[len(prefix):]
+        root.set('xmlns', self.MAIN_NS)
+        return ElementTree.tostring(root)
+
+    def _workbook(self, xml):
+        # replaces sheet list and drops defined names referring to old sheet positions
+        names = [escape(name, {'"': '&quot;'}) for _, _, name, _ in self.sheets]
+        sheets = ''.join(f'<sheet xmlns:r="{self.REL_NS}" name="{name}" sheetId="{n}" state="visible" r:id="rId{n}"/>'
+            for n, name in enumerate(names, start=1))
+        xml = re.sub(rb'<sheets>.*?</sheets>|<sheets\s*/>', f'<sheets>{sheets}</sheets>'.encode(), xml, flags=re.S)
+        xml = re.sub(rb'<definedNames>.*?</definedNames>', b'', xml, flags=re.S)
+        return re.sub(rb'activeTab="\d+"', b'activeTab="0"', xml)
+
+    def _workbook_rels(self, copied):
+        rel_type = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+        rels = [(f'{rel_type}/worksheet', f'/xl/worksheets/sheet{n}.xml')
+            for n in range(1, len(self.sheets) + 1)]
+        rels.append((f'{rel_type}/styles', 'styles.xml'))
+        if '/xl/theme/theme1.xml' in copied:
+            rels.append((f'{rel_type}/theme', 'theme/theme1.xml'))
+        if self.shared_strings:
+            rels.append((f'{rel_type}/sharedStrings', 'sharedStrings.xml'))
+        content = ''.join(f'<Relationship Type="{t}" Target="{target}" Id="rId{n}"/>'
+            for n, (t, target) in enumerate(rels, start=1))
+        return f'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">{content}</Relationships>'
+
+    def _content_types(self, copied):
+        # declares only parts which are actually written
+        written = {'/xl/workbook.xml', '/xl/styles.xml', *copied}
+        if self.shared_strings:
+            written.add('/xl/sharedStrings.xml')
+        overrides = [(f'/xl/worksheets/sheet{n}.xml', self.WORKSHEET_CONTENT_TYPE)
+            for n in range(1, len(self.sheets) + 1)]
+        overrides.extend((part, content_type)
+            for part, content_type in self.CONTENT_TYPES.items()
+            if part in written)
+        content = ''.join(f'<Override PartName="{part}" ContentType="{content_type}"/>'
+            for part, content_type in overrides)
+        return ('<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            f'<Default Extension="xml" ContentType="application/xml"/>{content}</Types>')
+
+class ParallelZipWriter:
+
+    # archive passed to openpyxl's ExcelWriter instead of ZipFile: parts are
+    # compressed in threads as soon as they are produced and written in order,
+    # pending parts are limited by size, large worksheets are compressed
+    # in chunks straight from their temporary files
+
+    ZIP64_LIMIT = 0xFFFFFFFF
+    ZIP_FILECOUNT_LIMIT = 0xFFFF
+    MAX_PENDING_SIZE = 64 << 20
+    STREAM_PART_SIZE = 16 << 20
+    CHUNK_SIZE = 1 << 20
+
+    def __init__(self, path, compression_level=6, threads=None, cancellation=None):
+        if not 0 <= compression_level <= 9:
+            raise ValueError(f'Compression level must be between 0 and 9, got {compression_level}')
+        self.compression_level = compression_level
+        self.method = ZIP_STORED if compression_level == 0 else ZIP_DEFLATED
+        self.cancellation = cancellation or CancellationToken()
+        self.file = open(path, mode='wb')
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+        self.pending = deque()
+        self.pending_size = 0
+        self.names = []
+        self.entries = []
+
+        # stats: compression is summed over threads and overlaps with serialization,
+        # busy time is all time the caller spent in archive methods
+        self.compress_times = []
+        self.wait_time = 0
+        self.write_time = 0
+        self.busy_time = 0
+        self.uncompressed_size = 0
+        self.compressed_size = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.executor.shutdown(cancel_futures=True)
+            self.file.close()
+
+    @property
+    def compress_time(self):
+        return sum(self.compress_times)
+
+    def writestr(self, zinfo_or_arcname, data):
+        start = time()
+        if isinstance(zinfo_or_arcname, zipfile.ZipInfo):
+            name, date_time = zinfo_or_arcname.filename, zinfo_or_arcname.date_time
+        else:
+            name, date_time = zinfo_or_arcname, localtime()[:6]
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._submit(name, date_time, data)
+        self.busy_time += time() - start
+
+    def write(self, filename, arcname=None):
+        # worksheets are written by openpyxl to temporary files,
+        # which are removed right after this call
+        start = time()
+        name = arcname or filename
+        size = getsize(filename)
+        with open(filename, mode='rb') as f:
+            if size < self.STREAM_PART_SIZE:
+                self._submit(name, localtime()[:6], f.read())
+            else:
+                self.cancellation.check()
+                self.names.append(name)
+                self.uncompressed_size += size
+                # earlier parts go first to keep archive order
+                self._flush(drain=True)
+                self._write_stream(name, localtime()[:6], size, f)
+        self.busy_time += time() - start
+
+    def namelist(self):
+        return list(self.names)
+
+    def close(self):
+        if self.file.closed:
+            return
+        start = time()
+        self._flush(drain=True)
+        self.executor.shutdown()
+        write_start = time()
+        self._write_central_directory()
+        self.compressed_size = self.file.tell()
+        self.file.close()
+        self.write_time += time() - write_start
+        self.busy_time += time() - start
+
+    def _submit(self, name, date_time, data):
+        self.cancellation.check()
+        self.names.append(name)
+        self.uncompressed_size += len(data)
+        self.pending_size += len(data)
+        self.pending.append((name, date_time, len(data), self.executor.submit(self._compress, data)))
+        self._flush()
+
+    def _flush(self, drain=False):
+        # writes finished parts, waits for the oldest ones while pending size is over limit
+        while self.pending and (drain or self.pending_size > self.MAX_PENDING_SIZE
+                or self.pending[0][3].done()):
+            name, date_time, size, future = self.pending.popleft()
+            self.pending_size -= size
+            self._write_entry(name, date_time, size, future)
+
+    def _compress(self, data):
+        # zlib releases the GIL, so parts are compressed concurrently
+        start = time()
+        crc = zlib.crc32(data)
+        if self.compression_level == 0:
+            payload = data
+        else:
+            compressor = zlib.compressobj(self.compression_level, zlib.DEFLATED, -15)
+            payload = compressor.compress(data) + compressor.flush()
+        self.compress_times.append(time() - start)
+        return crc, payload
+
+    def _write_entry(self, name, date_time, size, future):
+        self.cancellation.check()
+        start = time()
+        crc, payload = future.result()
+        self.wait_time += time() - start
+
+        # sizes beyond 4 GiB are stored in zip64 extra field
+        zip64 = size >= self.ZIP64_LIMIT or len(payload) >= self.ZIP64_LIMIT
+        start = time()
+        offset = self.file.tell()
+        self.file.write(self._local_header(name, date_time, crc, len(payload), size, zip64))
+        self.file.write(payload)
+        self.write_time += time() - start
+        self.entries.append((name, date_time, crc, len(payload), size, offset))
+
+    def _write_stream(self, name, date_time, size, f):
+        # compresses in chunks, local header is written again once crc and
+        # compressed size are known; zip64 margin for deflate overhead as in zipfile
+        zip64 = size * 1.05 > self.ZIP64_LIMIT
+        offset = self.file.tell()
+        self.file.write(self._local_header(name, date_time, 0, 0, size, zip64))
+        compressor = zlib.compressobj(self.compression_level, zlib.DEFLATED, -15) \
+            if self.compression_level else None
+        crc, compressed = 0, 0
+        for chunk in iter(lambda: f.read(self.CHUNK_SIZE), b''):
+            self.cancellation.check()
+            start = time()
+            crc = zlib.crc32(chunk, crc)
+            if compressor:
+                chunk = compressor.compress(chunk)
+            self.compress_times.append(time() - start)
+            start = time()
+            self.file.write(chunk)
+            self.write_time += time() - start
+            compressed += len(chunk)
+        if compressor:
+            chunk = compressor.flush()
+            self.file.write(chunk)
+            compressed += len(chunk)
+        if not zip64 and compressed >= self.ZIP64_LIMIT:
+            raise zipfile.LargeZipFile(f'Compressed size of {name} exceeds zip64 limit')
+
+        start = time()
+        end = self.file.tell()
+        self.file.seek(offset)
+        self.file.write(self._local_header(name, date_time, crc, compressed, size, zip64))
+        self.file.seek(end)
+        self.write_time += time() - start
+        self.entries.append((name, date_time, crc, compressed, size, offset))
+
+    def _local_header(self, name, date_time, crc, compressed, size, zip64):
+        name = name.encode('utf-8')
+        flags = 0x800 if not name.isascii() else 0
+        dos_time, dos_date = self._dos_date_time(date_time)
+        extra = struct.pack('<HHQQ', 1, 16, size, compressed) if zip64 else b''
+        header = struct.pack(zipfile.structFileHeader, zipfile.stringFileHeader,
+            45 if zip64 else 20, 0, flags, self.method, dos_time, dos_date, crc,
+            self.ZIP64_LIMIT if zip64 else compressed, self.ZIP64_LIMIT if zip64 else size,
+            len(name), len(extra))
+        return header + name + extra
+
+    def _write_central_directory(self):
+        start = self.file.tell()
+        for name, date_time, crc, compressed, size, offset in self.entries:
+            name = name.encode('utf-8')
+            flags = 0x800 if not name.isascii() else 0
+            dos_time, dos_date = self._dos_date_time(date_time)
+            zip64 = [v for v in (size, compressed, offset) if v >= self.ZIP64_LIMIT]
+            extra = struct.pack(f'<HH{len(zip64)}Q', 1, 8 * len(zip64), *zip64) if zip64 else b''
+            version = 45 if zip64 else 20
+            self.file.write(struct.pack(zipfile.structCentralDir, zipfile.stringCentralDir,
+                version, 0, version, 0, flags, self.method, dos_time, dos_date, crc,
+                min(compressed, self.ZIP64_LIMIT), min(size, self.ZIP64_LIMIT),
+                len(name), len(extra), 0, 0, 0, 0, min(offset, self.ZIP64_LIMIT)))
+            self.file.write(name)
+            self.file.write(extra)
+        size = self.file.tell() - start
+        count = len(self.entries)
+
+        # zip64 end of central directory record and locator
+        if count >= self.ZIP_FILECOUNT_LIMIT or start >= self.ZIP64_LIMIT or size >= self.ZIP64_LIMIT:
+            zip64_end = self.file.tell()
+            self.file.write(struct.pack(zipfile.structEndArchive64, zipfile.stringEndArchive64,
+                zipfile.sizeEndCentDir64 - 12, 45, 45, 0, 0, count, count, size, start))
+            self.file.write(struct.pack(zipfile.structEndArchive64Locator,
+                zipfile.stringEndArchive64Locator, 0, zip64_end, 1))
+        self.file.write(struct.pack(zipfile.structEndArchive, zipfile.stringEndArchive,
+            0, 0, min(count, self.ZIP_FILECOUNT_LIMIT), min(count, self.ZIP_FILECOUNT_LIMIT),
+            min(size, self.ZIP64_LIMIT), min(start, self.ZIP64_LIMIT), 0))
+
+    @staticmethod
+    def _dos_date_time(date_time):
+        year, month, day, hour, minute, second = date_time
+        return (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day
+
+Range = namedtuple('Range', 'x1 y1 x2 y2')
+ExportEvent = namedtuple('ExportEvent', 'name table_index table_name finished total rows cols cells elapsed tables_per_second eta')
\ No newline at end of file